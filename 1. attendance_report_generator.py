@@ -13,8 +13,24 @@ Date: January 2026
 # ============================================================================
 
 import pandas as pd
-from docx import Document
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
 import os
+from report_worker import prepare_template, init_worker, build_docx
+from student_loader import load_student_chunks
+# WHAT IS 'tqdm'?
+# - Draws a progress bar in the terminal: "45%|████▌     | 450/1000"
+# - Printing a line for EVERY report slows the whole run down; tqdm
+#   only redraws the bar a few times per second
+#
+# WHAT IS 'ProcessPoolExecutor'?
+# - Runs a function in several Python processes at the same time
+# - Each student's report is independent, so every CPU core can build reports
+#
+# WHAT IS 'report_worker'?
+# - A small file of our own (report_worker.py) that fills in the template
+# - It must be in the SAME FOLDER as this script
 
 
 # ============================================================================
@@ -30,132 +46,160 @@ TEMPLATE_DOCX = '/Users/ayanachakzai/Downloads/attendance report/ATTENDANCE_REPO
 # Fixed the missing slash here!
 OUTPUT_DIR = '/Users/ayanachakzai/Downloads/attendance report/attendance_reports'
 
+# The only columns we need from the sheet, and how to store them
+# WHY LIST THEM?
+# - pandas then skips every other column while reading, which is faster
+# - 'category' stores repeated text (like the campus name) only once
+STUDENT_COLUMNS = ['Name', 'Surname', 'BNU ID', 'Campus', 'LIVE']
+STUDENT_DTYPES = {'BNU ID': 'Int64', 'LIVE': 'float64', 'Campus': 'category'}
 
-# ============================================================================
-# SECTION 3: CREATE OUTPUT FOLDER
-# ============================================================================
-
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+# How many students are read from the sheet and processed at a time
+# - Keeps memory use the same whether the sheet has 100 rows or 1,000,000
+CHUNK_SIZE = 50_000
 
 
 # ============================================================================
-# SECTION 4: READ THE EXCEL FILE
+# SECTION 3: READ THE EXCEL FILE (A CHUNK AT A TIME)
 # ============================================================================
 
-print("📖 Reading student attendance data...")
-
-df = pd.read_excel(INPUT_EXCEL, skiprows=1)
+# WHAT IS 'student_loader'?
+# - Another small file of our own (student_loader.py), shared with script 3
+# - It reads CHUNK_SIZE rows at a time, and saves a Parquet copy of the sheet
+#   the first time: reading .xlsx is slow, Parquet is many times faster
+# - It must be in the SAME FOLDER as this script too
+
+
+def prepare_students(df):
+    """Clean one chunk of students and turn it into the details render_one() needs"""
+    # WHY '.copy()'?
+    # - We change the Name/Surname columns below; without a copy, pandas
+    #   warns that we might be changing the original chunk as well
+    df = df.dropna(subset=['BNU ID']).copy()
+    
+    df['Name'] = df['Name'].str.strip()
+    
+    df['Surname'] = df['Surname'].str.strip()
+    
+    # Build every name, ID and file path with whole-column operations,
+    # instead of formatting them one student at a time inside the loop
+    bnu_ids = df['BNU ID'].astype('int64').astype(str)
+    # fillna('nan'): a missing name is written as 'nan', like str() would -
+    # newer pandas keeps it as a gap that would blank out the whole path
+    names = df['Name'].fillna('nan').astype(str)
+    surnames = df['Surname'].fillna('nan').astype(str)
+    
+    full_names = (names + ' ' + surnames).to_numpy()
+    output_paths = (
+        os.path.join(OUTPUT_DIR, '') + bnu_ids + '_' + surnames + '_' + names
+        + '_Attendance_Report.docx'
+    ).to_numpy()
+    
+    # Work out every student's attendance category in ONE go, before the loop
+    # WHAT IS 'np.select()'?
+    # - Checks the conditions in order and picks the matching choice
+    # - Here the choice is the row of the attendance table to tick:
+    #   1 = Excellent (80%+), 2 = Very good (70%+), 3 = Good (60%+),
+    #   4 = Attendance could be better (everything else)
+    attendance_percents = df['LIVE'].to_numpy() * 100
+    
+    attendance_rows = np.select(
+        [attendance_percents >= 80, attendance_percents >= 70, attendance_percents >= 60],
+        [1, 2, 3],
+        default=4
+    )
+    
+    # Pull each column out once as a plain array and walk them side by side
+    # WHY NOT df.iterrows()?
+    # - iterrows() builds a whole pandas Series for every row, which is slow
+    # - zip() over plain arrays just hands us the values
+    return list(zip(
+        full_names,
+        bnu_ids.to_numpy(),
+        df['Campus'].to_numpy(),
+        attendance_rows,
+        output_paths,
+    ))
 
 
 # ============================================================================
-# SECTION 5: CLEAN THE DATA
+# SECTION 4: FILL ONE STUDENT'S REPORT (runs inside the worker processes)
 # ============================================================================
 
-df = df.dropna(subset=['BNU ID'])
-
-df['Name '] = df['Name '].str.strip()
+# HOW IS A REPORT MADE?
+# - A .docx is a zip of XML files; only 'word/document.xml' holds our table
+# - report_worker.py (next to this script) uses python-docx ONCE to put markers
+#   like {{STUDENT_NAME}} into the cells, then fills each student's report by
+#   simple text replacement - the app uses the very same code
 
-df['Surname'] = df['Surname'].str.strip()
-
-df = df.rename(columns={'Name ': 'Name'})
-
-print(f"✅ Found {len(df)} students to process\n")
+def render_one(student):
+    """Fill the template for one student and save it as a .docx"""
+    student_name, bnu_id, campus, attendance_row, output_path = student
+    
+    with open(output_path, 'wb') as report:
+        report.write(build_docx(student_name, bnu_id, campus, attendance_row))
+    
+    return output_path
 
 
 # ============================================================================
-# SECTION 6: PROCESS EACH STUDENT (Main Loop)
+# SECTION 5: MAIN PROGRAM
 # ============================================================================
 
-for index, row in df.iterrows():
-    
-    # ========================================================================
-    # SECTION 6A: EXTRACT STUDENT DATA
-    # ========================================================================
-    
-    student_name = f"{row['Name']} {row['Surname']}"
-    
-    bnu_id = str(int(row['BNU ID']))
-    
-    campus = row['Campus']
-    
-    attendance = row['LIVE']
+# WHAT IS 'if __name__ == '__main__''?
+# - True only when YOU run this file, not when a worker process loads it
+# - Without it, every worker would start generating all the reports again!
+if __name__ == '__main__':
     
     # ========================================================================
-    # SECTION 6B: CALCULATE ATTENDANCE PERCENTAGE
+    # SECTION 5A: CREATE OUTPUT FOLDER AND READ THE TEMPLATE
     # ========================================================================
     
-    attendance_percent = attendance * 100
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
     
-    # ========================================================================
-    # SECTION 6C: DETERMINE ATTENDANCE CATEGORY
-    # ========================================================================
+    # Read the template file ONCE - every report starts from these same bytes,
+    # so there is no need to go back to the disk for each student
+    with open(TEMPLATE_DOCX, 'rb') as template:
+        template_bytes = template.read()
     
-    if attendance_percent >= 80:
-        attendance_category = "Excellent attendance"
-    elif attendance_percent >= 70:
-        attendance_category = "Very good attendance"
-    elif attendance_percent >= 60:
-        attendance_category = "Good attendance"
-    else:
-        attendance_category = "Attendance could be better"
+    skeleton_bytes, document_xml_name, document_xml = prepare_template(template_bytes)
     
     # ========================================================================
-    # SECTION 6D: SHOW PROGRESS
+    # SECTION 5B: READ THE DATA AND GENERATE THE REPORTS (IN PARALLEL)
     # ========================================================================
     
-    print(f"📝 Processing {index+1}/{len(df)}: {student_name} ({bnu_id}) - {attendance_percent:.1f}%")
+    print("📖 Reading student attendance data...")
+    
+    total_students = 0
+    
+    progress = tqdm(total=0, unit='report', desc='📝 Saving reports')
+    
+    # WHAT IS 'executor.map()'?
+    # - Hands the students out to the worker processes (32 at a time)
+    # - Gives the results back in the original order
+    #
+    # WHY 'initializer=init_worker'?
+    # - Gives each worker its own copy of the template ONCE, instead of
+    #   sending it along with every student
+    with ProcessPoolExecutor(initializer=init_worker, initargs=(skeleton_bytes, document_xml_name, document_xml)) as executor:
+        
+        # Only CHUNK_SIZE students are in memory at once, however big the sheet is
+        for chunk in load_student_chunks(INPUT_EXCEL, STUDENT_COLUMNS, STUDENT_DTYPES, CHUNK_SIZE):
+            students = prepare_students(chunk)
+            
+            # We only find out how many students there are one chunk at a time
+            progress.total += len(students)
+            progress.refresh()
+            
+            for output_path in executor.map(render_one, students, chunksize=32):
+                total_students += 1
+                progress.update()
+    
+    progress.close()
     
     # ========================================================================
-    # SECTION 6E: LOAD AND FILL TEMPLATE
+    # SECTION 5C: COMPLETION MESSAGE
     # ========================================================================
     
-    doc = Document(TEMPLATE_DOCX)
-    
-    table = doc.tables[0]
-    
-    table.rows[4].cells[1].text = student_name
-    
-    table.rows[5].cells[1].text = bnu_id
-    
-    table.rows[6].cells[1].text = campus
-    
-    # ========================================================================
-    # SECTION 6F: FILL ATTENDANCE CHECKBOX
-    # ========================================================================
-    
-    attendance_table = doc.tables[1]
-    
-    # Clear all checkboxes first (set to empty string)
-    attendance_table.rows[1].cells[1].text = ""
-    attendance_table.rows[2].cells[1].text = ""
-    attendance_table.rows[3].cells[1].text = ""
-    attendance_table.rows[4].cells[1].text = ""
-    
-    # Now mark the correct checkbox with "Yes"
-    if attendance_category == "Excellent attendance":
-        attendance_table.rows[1].cells[1].text = "Yes"
-    elif attendance_category == "Very good attendance":
-        attendance_table.rows[2].cells[1].text = "Yes"
-    elif attendance_category == "Good attendance":
-        attendance_table.rows[3].cells[1].text = "Yes"
-    else:  # "Attendance could be better"
-        attendance_table.rows[4].cells[1].text = "Yes"
-    
-    # ========================================================================
-    # SECTION 6G: SAVE THE DOCUMENT
-    # ========================================================================
-    
-    output_filename = f"{bnu_id}_{row['Surname']}_{row['Name']}_Attendance_Report.docx"
-    
-    output_path = os.path.join(OUTPUT_DIR, output_filename)
-    
-    doc.save(output_path)
-
-
-# ============================================================================
-# SECTION 7: COMPLETION MESSAGE
-# ============================================================================
-
-print(f"\n✅ DONE! Successfully generated {len(df)} attendance reports")
-print(f"📁 Reports saved in: {OUTPUT_DIR}/")
-print("\n🎉 You can now find all reports in the 'attendance_reports' folder!")
\ No newline at end of file
+    print(f"\n✅ DONE! Successfully generated {total_students} attendance reports")
+    print(f"📁 Reports saved in: {OUTPUT_DIR}/")
+    print("\n🎉 You can now find all reports in the 'attendance_reports' folder!")
@@ -13,11 +13,31 @@ Date: January 2026
 # ============================================================================
 
 import os
-import glob
+import shutil
+import asyncio
 import subprocess
+import tempfile
+import time
+from pathlib import Path
 # WHAT IS 'subprocess'?
 # - A library for running external programs/commands
 # - We'll use it to run LibreOffice from Python
+#
+# WHAT IS 'asyncio'?
+# - Lets one Python program wait on many things at the same time
+# - We use it to keep several LibreOffice processes running side by side
+
+# OPTIONAL: LibreOffice's own Python bridge ('uno')
+# - Lets us keep LibreOffice running and send it one file after another,
+#   instead of starting a new LibreOffice for every batch
+# - Comes with LibreOffice (e.g. the 'python3-uno' package on Linux);
+#   if Python can't find it we simply use the normal batch conversion
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+    HAS_UNO = True
+except ImportError:
+    HAS_UNO = False
 
 
 # ============================================================================
@@ -34,6 +54,19 @@ OUTPUT_DIR = '/Users/ayanachakzai/Downloads/attendance report/attendance_reports
 # - If you installed LibreOffice elsewhere, change this path
 LIBREOFFICE_PATH = '/Applications/LibreOffice.app/Contents/MacOS/soffice'
 
+# How many copies of LibreOffice may run at the same time (one per CPU core)
+MAX_WORKERS = os.cpu_count() or 1
+
+# How many files one LibreOffice call converts before it exits
+# WHY BATCHES?
+# - Starting LibreOffice takes 1-2 seconds, converting a file takes much less
+# - Handing it many files at once pays the start-up cost only once per batch
+BATCH_SIZE = 50
+
+# First network port for the long-running LibreOffice copies (only used with 'uno')
+# - Copy 1 listens on 2002, copy 2 on 2003, and so on
+FIRST_UNO_PORT = 2002
+
 
 # ============================================================================
 # SECTION 3: CHECK IF LIBREOFFICE IS INSTALLED
@@ -66,8 +99,14 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 print("🔍 Looking for .docx files...\n")
 
-docx_pattern = os.path.join(INPUT_DIR, '*.docx')
-docx_files = glob.glob(docx_pattern)
+# WHAT IS 'os.scandir()'?
+# - Lists a folder in one go and remembers what each entry is (file or folder)
+# - Quicker than glob, which matches a pattern and checks every file again
+docx_files = [
+    entry.path
+    for entry in os.scandir(INPUT_DIR)
+    if entry.name.endswith('.docx') and entry.is_file()
+]
 
 print(f"✅ Found {len(docx_files)} DOCX files to convert\n")
 
@@ -78,74 +117,238 @@ if not docx_files:
 
 
 # ============================================================================
-# SECTION 6: CONVERT EACH DOCX TO PDF
+# SECTION 6: CONVERT THE DOCX FILES TO PDF (IN PARALLEL BATCHES)
 # ============================================================================
 
 print("🔄 Starting conversion with LibreOffice...\n")
 
-for index, file_path in enumerate(docx_files):
-    
-    filename = os.path.basename(file_path)
-    
-    print(f"📄 Converting ({index + 1}/{len(docx_files)}): {filename}")
+# Split the files into batches, but keep them small enough that every
+# worker gets something to do
+batch_size = min(BATCH_SIZE, -(-len(docx_files) // MAX_WORKERS))
+batches = [docx_files[i:i + batch_size] for i in range(0, len(docx_files), batch_size)]
+
+
+async def convert_batch(batch, profile_dirs):
+    """Convert one batch of .docx files with its own LibreOffice process"""
+    # Wait for a free profile folder (this also limits how many run at once)
+    profile_dir = await profile_dirs.get()
     
     try:
-        # WHAT IS 'subprocess.run()'?
-        # - A FUNCTION that runs external commands/programs
-        # - Like typing commands in Terminal, but from Python
-        
         # Build the LibreOffice command
         # WHAT IS THIS COMMAND?
         # - Tells LibreOffice to:
+        #   -env:UserInstallation = use this worker's own profile folder
         #   --headless = run without opening a window
         #   --convert-to pdf = convert to PDF format
-        #   --outdir = where to save the PDF
-        #   file_path = the file to convert
+        #   --outdir = where to save the PDFs
+        #   *batch = every file in this batch
         command = [
             LIBREOFFICE_PATH,
+            f'-env:UserInstallation={Path(profile_dir).as_uri()}',
             '--headless',
             '--convert-to',
             'pdf',
             '--outdir',
             OUTPUT_DIR,
-            file_path
+            *batch
         ]
-        # WHAT IS A LIST OF STRINGS?
-        # - Each item is one part of the command
-        # - subprocess.run() will join them with spaces
         
-        # Run the command
-        result = subprocess.run(
-            command,
-            capture_output=True,
-            # WHAT IS 'capture_output=True'?
-            # - Captures what the program prints
-            # - Stores it so we can check for errors
-            
-            text=True,
-            # WHAT IS 'text=True'?
-            # - Returns output as TEXT (string)
-            # - Not as raw bytes
+        # WHAT IS 'asyncio.create_subprocess_exec()'?
+        # - Starts the program and lets Python get on with other work
+        # - 'await' waits for THIS program without blocking the others
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        _, stderr = await process.communicate()
+        
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, command, stderr=stderr)
+        
+        return batch, None
+        
+    except Exception as e:
+        return batch, e
+        
+    finally:
+        profile_dirs.put_nowait(profile_dir)
+
+
+async def convert_all(batches, max_workers=MAX_WORKERS):
+    """Run the batches side by side (up to max_workers at once) and report each one as it finishes"""
+    # Every LibreOffice running at the same time needs its OWN profile folder
+    # WHY?
+    # - LibreOffice locks its profile folder while it runs
+    # - A second copy using the same folder quietly does nothing
+    # - A queue hands each running batch a free profile and takes it back after
+    profile_dirs = asyncio.Queue()
+    for worker in range(min(max_workers, len(batches))):
+        profile_dirs.put_nowait(tempfile.mkdtemp(prefix=f'lo_profile_{worker}_'))
+    
+    converted = 0
+    total = sum(len(batch) for batch in batches)
+    
+    try:
+        tasks = [convert_batch(batch, profile_dirs) for batch in batches]
+        
+        for finished in asyncio.as_completed(tasks):
+            batch, error = await finished
             
-            check=True
-            # WHAT IS 'check=True'?
-            # - If command fails, raises an error
-            # - Lets us catch it in the except block
+            if error is None:
+                converted += len(batch)
+                print(f"📄 Converted {converted}/{total} files")
+                
+            elif isinstance(error, subprocess.CalledProcessError):
+                # WHAT IS 'CalledProcessError'?
+                # - An error that occurs when external command fails
+                # - Contains details about what went wrong
+                
+                print(f"   ❌ Error converting a batch of {len(batch)} files")
+                print(f"   Error details: {error}\n")
+                
+            else:
+                # Catch any other errors
+                print(f"   ❌ Unexpected error: {error}\n")
+    
+    finally:
+        # Remove the temporary LibreOffice profiles
+        while not profile_dirs.empty():
+            shutil.rmtree(profile_dirs.get_nowait(), ignore_errors=True)
+
+
+def uno_property(name, value):
+    """Build one of the name/value settings LibreOffice's UNO functions expect"""
+    prop = PropertyValue()
+    prop.Name = name
+    prop.Value = value
+    return prop
+
+
+def convert_with_listener(worker, files):
+    """Start ONE LibreOffice that stays open, and convert all these files through it"""
+    # WHAT IS A LISTENER?
+    # - LibreOffice started with --accept waits for commands on a network port
+    # - We connect to it once and ask it to open/save each file in turn,
+    #   so LibreOffice only starts up once for all of this worker's files
+    port = FIRST_UNO_PORT + worker
+    profile_dir = tempfile.mkdtemp(prefix=f'lo_profile_{worker}_')
+    
+    office = subprocess.Popen(
+        [
+            LIBREOFFICE_PATH,
+            f'-env:UserInstallation={Path(profile_dir).as_uri()}',
+            '--headless',
+            '--invisible',
+            '--nologo',
+            '--norestore',
+            '--nofirststartwizard',
+            f'--accept=socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext'
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    
+    try:
+        # Connect to it (it needs a few seconds to start listening)
+        local_context = uno.getComponentContext()
+        resolver = local_context.ServiceManager.createInstanceWithContext(
+            'com.sun.star.bridge.UnoUrlResolver', local_context
         )
         
-        print(f"   ✅ Saved to: {OUTPUT_DIR}\n")
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                context = resolver.resolve(
+                    f'uno:socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext'
+                )
+                break
+            except Exception:
+                if time.monotonic() > deadline or office.poll() is not None:
+                    office.kill()
+                    raise
+                time.sleep(0.5)
         
-    except subprocess.CalledProcessError as e:
-        # WHAT IS 'CalledProcessError'?
-        # - An error that occurs when external command fails
-        # - Contains details about what went wrong
+        desktop = context.ServiceManager.createInstanceWithContext(
+            'com.sun.star.frame.Desktop', context
+        )
         
-        print(f"   ❌ Error converting {filename}")
-        print(f"   Error details: {e}\n")
+        for file_path in files:
+            filename = os.path.basename(file_path)
+            pdf_path = os.path.join(OUTPUT_DIR, os.path.splitext(filename)[0] + '.pdf')
+            
+            try:
+                document = desktop.loadComponentFromURL(
+                    Path(file_path).resolve().as_uri(), '_blank', 0,
+                    (uno_property('Hidden', True),)
+                )
+                try:
+                    document.storeToURL(
+                        Path(pdf_path).resolve().as_uri(),
+                        (uno_property('FilterName', 'writer_pdf_Export'),)
+                    )
+                finally:
+                    document.close(True)
+                
+                print(f"📄 Converted: {filename}")
+                
+            except Exception as e:
+                print(f"   ❌ Error converting {filename}")
+                print(f"   Error details: {e}\n")
         
+        try:
+            desktop.terminate()
+        except Exception:
+            # LibreOffice drops the connection as it quits - that's expected
+            pass
+    
+    finally:
+        try:
+            office.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            office.kill()
+        shutil.rmtree(profile_dir, ignore_errors=True)
+
+
+async def convert_with_listener_or_batches(worker, files):
+    """Convert one worker's files through its listener - or in batches if we can't connect to it"""
+    # WHAT IS 'asyncio.to_thread()'?
+    # - Runs a normal (blocking) function in the background so asyncio
+    #   can look after several LibreOffice copies at once
+    try:
+        await asyncio.to_thread(convert_with_listener, worker, files)
+    
     except Exception as e:
-        # Catch any other errors
-        print(f"   ❌ Unexpected error: {e}\n")
+        # e.g. another program is already using this worker's port
+        print(f"   ⚠️ Could not connect to LibreOffice on port {FIRST_UNO_PORT + worker}: {e}")
+        print(f"   Converting its {len(files)} files in batches instead\n")
+        
+        # One batch at a time, so this worker still runs one LibreOffice
+        await convert_all(
+            [files[i:i + BATCH_SIZE] for i in range(0, len(files), BATCH_SIZE)],
+            max_workers=1
+        )
+
+
+async def convert_all_with_listeners(files):
+    """Share the files between several long-running LibreOffice copies"""
+    workers = min(MAX_WORKERS, len(files))
+    
+    await asyncio.gather(*[
+        convert_with_listener_or_batches(worker, files[worker::workers])
+        for worker in range(workers)
+    ])
+
+
+# WHAT IS 'asyncio.run()'?
+# - Starts asyncio, runs the conversion until every file is done, then stops
+if HAS_UNO:
+    print("🔌 Using long-running LibreOffice listeners (uno found)\n")
+    asyncio.run(convert_all_with_listeners(docx_files))
+else:
+    asyncio.run(convert_all(batches))
+
+print(f"\n   ✅ Saved to: {OUTPUT_DIR}\n")
 
 
 # ============================================================================
@@ -188,5 +391,9 @@ print("=" * 50)
 # subprocess.run(['ls', '-la', '/Users'])
 # = ls -la /Users
 # 
-# Our LibreOffice command:
-# soffice --headless --convert-to pdf --outdir /path/to/output file.docx
+# Our LibreOffice command (one per batch, several batches at once):
+# soffice -env:UserInstallation=file:///tmp/lo_profile_0 --headless --convert-to pdf --outdir /path/to/output a.docx b.docx ...
+# 
+# With 'uno' available, each worker instead starts LibreOffice ONCE with:
+# soffice -env:UserInstallation=file:///tmp/lo_profile_0 --headless --accept=socket,host=127.0.0.1,port=2002;urp;StarOffice.ComponentContext
+# and sends it every file over that connection.
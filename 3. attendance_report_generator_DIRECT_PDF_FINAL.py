@@ -9,10 +9,17 @@ Date: January 2026
 """
 
 import pandas as pd
-from docx import Document
+import numpy as np
 import os
+import shutil
 import subprocess
 import tempfile
+import zipfile
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
+from report_worker import prepare_template, build_docx, init_worker as init_template
+from student_loader import load_student_chunks
 
 # ============================================================================
 # CONFIGURATION
@@ -25,204 +32,250 @@ OUTPUT_DIR = '/Users/ayanachakzai/Downloads/attendance report/attendance_reports
 # Path to LibreOffice
 LIBREOFFICE_PATH = '/Applications/LibreOffice.app/Contents/MacOS/soffice'
 
-# ============================================================================
-# CHECK IF LIBREOFFICE IS INSTALLED
-# ============================================================================
+# The only columns we use, and the types to store them as
+# ('category' keeps repeated text like campus/group names only once in memory)
+STUDENT_COLUMNS = ['Name', 'Surname', 'BNU ID', 'Campus', 'LIVE', 'Group Ref']
+STUDENT_DTYPES = {'BNU ID': 'Int64', 'LIVE': 'float64', 'Campus': 'category', 'Group Ref': 'category'}
 
-if not os.path.exists(LIBREOFFICE_PATH):
-    print("❌ ERROR: LibreOffice not found!")
-    print(f"   Expected location: {LIBREOFFICE_PATH}")
-    print("\n📥 Please install LibreOffice:")
-    print("   1. Download from: https://www.libreoffice.org/download/download/")
-    print("   2. Install it like any other Mac app")
-    print("   3. Run this script again")
-    exit(1)
+# Students read and processed per chunk - keeps memory flat for very large sheets
+CHUNK_SIZE = 50_000
 
 # ============================================================================
-# CREATE OUTPUT FOLDER
+# READ THE ATTENDANCE DATA (CHUNK_SIZE ROWS AT A TIME)
 # ============================================================================
 
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+# Reading the sheet, and its Parquet copy, is shared with script 1 (student_loader.py)
 
-print("📖 Reading student attendance data...")
 
-df = pd.read_excel(INPUT_EXCEL, skiprows=1)
+def prepare_students(df):
+    """Clean one chunk; return its (name, ID, campus, row, group, filename) tuples for render_one() and its groups"""
+    # .copy() so the edits below don't trigger pandas' SettingWithCopyWarning
+    df = df.dropna(subset=['BNU ID']).copy()
 
-# ============================================================================
-# CLEAN COLUMN NAMES
-# ============================================================================
+    # WHAT CHANGED HERE?
+    # - BEFORE: df['Name '] (with space, because column had space)
+    # - AFTER: df['Name'] (no space, because we stripped column names)
+    df['Name'] = df['Name'].str.strip()
 
-df.columns = df.columns.str.strip()
+    df['Surname'] = df['Surname'].str.strip()
 
-print("✅ Column names cleaned")
-print(f"   Available columns: {df.columns.tolist()}\n")
-
-# ============================================================================
-# CLEAN AND PREPARE DATA
-# ============================================================================
+    # Build every name, ID and filename with whole-column operations before
+    # the loop, instead of formatting them one student at a time
+    bnu_ids = df['BNU ID'].astype('int64').astype(str)
+    # A missing name becomes 'nan' rather than a gap that blanks the whole filename
+    names = df['Name'].fillna('nan').astype(str)
+    surnames = df['Surname'].fillna('nan').astype(str)
+    full_names = names + ' ' + surnames
+    filenames = (
+        bnu_ids + '_' + surnames + '_' + names
+        + '_Attendance_Report.pdf'
+    )
 
-df = df.dropna(subset=['BNU ID'])
+    # Pick the attendance table row to tick for every student in one go:
+    # 1 = Excellent (80%+), 2 = Very good (70%+), 3 = Good (60%+), 4 = could be better
+    attendance_percents = df['LIVE'].to_numpy() * 100
 
-# WHAT CHANGED HERE?
-# - BEFORE: df['Name '] (with space, because column had space)
-# - AFTER: df['Name'] (no space, because we stripped column names)
-df['Name'] = df['Name'].str.strip()
+    attendance_rows = np.select(
+        [attendance_percents >= 80, attendance_percents >= 70, attendance_percents >= 60],
+        [1, 2, 3],
+        default=4
+    )
 
-df['Surname'] = df['Surname'].str.strip()
+    # Walk the prepared columns as plain arrays - much faster than df.iterrows()
+    students = list(zip(
+        full_names.to_numpy(),
+        bnu_ids.to_numpy(),
+        df['Campus'].to_numpy(),
+        attendance_rows,
+        df['Group Ref'].to_numpy(),
+        filenames.to_numpy(),
+    ))
 
-# WHAT CHANGED HERE?
-# - BEFORE: df.rename(columns={'Name ': 'Name'}) - renamed column
-# - AFTER: No rename needed! Column is already 'Name' after strip
+    return students, df['Group Ref']
 
-print(f"✅ Found {len(df)} students to process\n")
 
 # ============================================================================
-# GET UNIQUE GROUPS
+# BUILD ONE STUDENT'S PDF (runs inside the worker processes)
 # ============================================================================
 
-unique_groups = df['Group Ref'].unique()
-unique_groups = sorted(unique_groups)
+# The template is prepared and filled by report_worker.py (next to this
+# script), the same code script 1 and the web app use
 
-print(f"📊 Found {len(unique_groups)} unique groups:")
-for group in unique_groups:
-    student_count = (df['Group Ref'] == group).sum()
-    print(f"   • {group}: {student_count} students")
-
-print()
-
-# ============================================================================
-# PROCESS EACH STUDENT - GENERATE PDF DIRECTLY
-# ============================================================================
-
-for index, row in df.iterrows():
-    
-    student_name = f"{row['Name']} {row['Surname']}"
-    
-    bnu_id = str(int(row['BNU ID']))
+def init_worker(skeleton_bytes, document_xml_name, document_xml, profiles_root):
+    """Set up a worker process: keep the template and give it its own LibreOffice profile"""
+    global LIBREOFFICE_PROFILE, WORK_DOCX
     
-    campus = row['Campus']
+    init_template(skeleton_bytes, document_xml_name, document_xml)
     
-    attendance = row['LIVE']
+    # Several LibreOffice copies run at once, and each one needs its own
+    # profile folder - two copies sharing a profile lock each other out
+    LIBREOFFICE_PROFILE = Path(tempfile.mkdtemp(dir=profiles_root)).as_uri()
     
-    student_group = row['Group Ref']
-
-    attendance_percent = attendance * 100
-   
-    if attendance_percent >= 80:
-        attendance_category = "Excellent attendance"
-    elif attendance_percent >= 70:
-        attendance_category = "Very good attendance"
-    elif attendance_percent >= 60:
-        attendance_category = "Good attendance"
-    else:
-        attendance_category = "Attendance could be better"
-    
-    print(f"📝 Processing {index+1}/{len(df)}: {student_name} ({bnu_id}) - {attendance_percent:.1f}%")
-   
-    # ========================================================================
-    # CREATE THE WORD DOCUMENT
-    # ========================================================================
-    
-    doc = Document(TEMPLATE_DOCX)
-    
-    table = doc.tables[0]
-    
-    table.rows[4].cells[1].text = student_name
-    
-    table.rows[5].cells[1].text = bnu_id
-    
-    table.rows[6].cells[1].text = campus
-  
-    attendance_table = doc.tables[1]
-    
-    attendance_table.rows[1].cells[1].text = ""
-    attendance_table.rows[2].cells[1].text = ""
-    attendance_table.rows[3].cells[1].text = ""
-    attendance_table.rows[4].cells[1].text = ""
-    
-    if attendance_category == "Excellent attendance":
-        attendance_table.rows[1].cells[1].text = "Yes"
-    elif attendance_category == "Very good attendance":
-        attendance_table.rows[2].cells[1].text = "Yes"
-    elif attendance_category == "Good attendance":
-        attendance_table.rows[3].cells[1].text = "Yes"
-    else:
-        attendance_table.rows[4].cells[1].text = "Yes"
-   
-    # ========================================================================
-    # CREATE GROUP FOLDER
-    # ========================================================================
+    # One working .docx per worker, overwritten for every student; it lives in
+    # profiles_root, so the main program deletes it along with the profiles
+    WORK_DOCX = os.path.join(profiles_root, f'lo_work_{os.getpid()}.docx')
+
+
+def render_one(student):
+    """Fill the template for one student and convert it to PDF; returns an error or None"""
+    student_name, bnu_id, campus, attendance_row, student_group, pdf_filename = student
     
+    # The group folders were all created up front by the main program
     group_folder = os.path.join(OUTPUT_DIR, student_group)
-    os.makedirs(group_folder, exist_ok=True)
     
     # ========================================================================
     # SAVE AS PDF DIRECTLY
     # ========================================================================
     
     try:
-        # Create temporary .docx file
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as temp_docx:
-            temp_docx_path = temp_docx.name
-            doc.save(temp_docx_path)
+        # Overwrite this worker's .docx with this student's report. Its
+        # document.xml is stored uncompressed: LibreOffice reads it straight
+        # back, so compressing it would only waste time
+        with open(WORK_DOCX, 'wb') as work_docx:
+            work_docx.write(build_docx(
+                student_name, bnu_id, campus, attendance_row,
+                compress_type=zipfile.ZIP_STORED
+            ))
         
-        # Create PDF filename
-        pdf_filename = f"{bnu_id}_{row['Surname']}_{row['Name']}_Attendance_Report.pdf"
         pdf_path = os.path.join(group_folder, pdf_filename)
         
-        # Convert to PDF using LibreOffice
+        # Convert to PDF using this worker's own LibreOffice profile
         command = [
             LIBREOFFICE_PATH,
+            f'-env:UserInstallation={LIBREOFFICE_PROFILE}',
             '--headless',
             '--convert-to',
             'pdf',
             '--outdir',
             group_folder,
-            temp_docx_path
+            WORK_DOCX
         ]
         
-        result = subprocess.run(
+        # Its messages are discarded - a failure is still caught below
+        subprocess.run(
             command,
-            capture_output=True,
-            text=True,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
             check=True
         )
         
-        # Delete temporary .docx
-        os.unlink(temp_docx_path)
-        
         # Rename PDF to our desired filename
-        temp_pdf_name = os.path.splitext(os.path.basename(temp_docx_path))[0] + '.pdf'
+        temp_pdf_name = os.path.splitext(os.path.basename(WORK_DOCX))[0] + '.pdf'
         temp_pdf_path = os.path.join(group_folder, temp_pdf_name)
         
         if os.path.exists(temp_pdf_path):
             os.rename(temp_pdf_path, pdf_path)
         
-        print(f"   ✅ Saved as PDF: {pdf_filename}\n")
+        return None
         
     except subprocess.CalledProcessError as e:
-        print(f"   ❌ Error converting to PDF: {e}\n")
-        if os.path.exists(temp_docx_path):
-            os.unlink(temp_docx_path)
+        return f"Error converting to PDF: {e}"
             
     except Exception as e:
-        print(f"   ❌ Unexpected error: {e}\n")
-        if 'temp_docx_path' in locals() and os.path.exists(temp_docx_path):
-            os.unlink(temp_docx_path)
+        return f"Unexpected error: {e}"
 
 
 # ============================================================================
-# COMPLETION MESSAGE
+# MAIN PROGRAM
 # ============================================================================
 
-print(f"\n✅ DONE! Successfully generated {len(df)} PDF reports")
-print(f"📁 PDFs organized by {len(unique_groups)} groups in: {OUTPUT_DIR}/")
-print("\n📂 Folder structure:")
-print(f"   {OUTPUT_DIR}/")
-for group in unique_groups:
-    student_count = (df['Group Ref'] == group).sum()
-    print(f"   ├── {group}/ ({student_count} PDFs)")
-print("\n🎉 All reports saved directly as PDF!")
+# Only the script you run does the work below - the worker processes
+# load this file too, but they must only use the functions above
+if __name__ == '__main__':
+
+    # ========================================================================
+    # CHECK IF LIBREOFFICE IS INSTALLED
+    # ========================================================================
+
+    if not os.path.exists(LIBREOFFICE_PATH):
+        print("❌ ERROR: LibreOffice not found!")
+        print(f"   Expected location: {LIBREOFFICE_PATH}")
+        print("\n📥 Please install LibreOffice:")
+        print("   1. Download from: https://www.libreoffice.org/download/download/")
+        print("   2. Install it like any other Mac app")
+        print("   3. Run this script again")
+        exit(1)
+
+    # ========================================================================
+    # CREATE OUTPUT FOLDER
+    # ========================================================================
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+    # Read the template once - each student's document is built from these bytes
+    with open(TEMPLATE_DOCX, 'rb') as template:
+        template_bytes = template.read()
+
+    skeleton_bytes, document_xml_name, document_xml = prepare_template(template_bytes)
+
+    print("📖 Reading student attendance data...")
+
+    # load_student_chunks() strips the column names (fixing the '\xa0Group Ref'
+    # header) and keeps only the columns listed in STUDENT_COLUMNS
+
+    # ========================================================================
+    # PROCESS EACH STUDENT - GENERATE PDF DIRECTLY (IN PARALLEL)
+    # ========================================================================
+
+    total_students = 0
+    group_counts = pd.Series(dtype='int64')
+    created_groups = set()
+
+    # One worker per CPU core, each converting its own students with its own LibreOffice
+    profiles_root = tempfile.mkdtemp(prefix='lo_profiles_')
+
+    # A progress bar instead of a printed line per student; only errors are printed
+    progress = tqdm(total=0, unit='PDF', desc='📝 Converting')
+
+    try:
+        with ProcessPoolExecutor(initializer=init_worker, initargs=(skeleton_bytes, document_xml_name, document_xml, profiles_root)) as executor:
+
+            # The sheet is read CHUNK_SIZE students at a time, so memory use
+            # stays flat however many students there are
+            for chunk in load_student_chunks(INPUT_EXCEL, STUDENT_COLUMNS, STUDENT_DTYPES, CHUNK_SIZE):
+                students, groups = prepare_students(chunk)
+
+                progress.total += len(students)
+                progress.refresh()
+
+                # Count the students in every group with one pass over the column
+                # (a category column also lists groups with no students left - drop those)
+                chunk_counts = groups.value_counts()
+                chunk_counts = chunk_counts[chunk_counts > 0]
+                group_counts = group_counts.add(chunk_counts, fill_value=0).astype('int64')
+
+                # Create each group's folder the first time we meet the group,
+                # instead of once per student
+                for group in chunk_counts.index:
+                    if group not in created_groups:
+                        os.makedirs(os.path.join(OUTPUT_DIR, group), exist_ok=True)
+                        created_groups.add(group)
+
+                for student, error in zip(students, executor.map(render_one, students)):
+                    total_students += 1
+                    progress.update()
+
+                    if error:
+                        # tqdm.write() prints above the bar without breaking it
+                        student_name, bnu_id = student[0], student[1]
+                        progress.write(f"   ❌ {student_name} ({bnu_id}): {error}")
+    finally:
+        progress.close()
+        shutil.rmtree(profiles_root, ignore_errors=True)
+
+    unique_groups = sorted(group_counts.index)
+
+    # ========================================================================
+    # COMPLETION MESSAGE
+    # ========================================================================
+
+    print(f"\n✅ DONE! Successfully generated {total_students} PDF reports")
+    print(f"📁 PDFs organized by {len(unique_groups)} groups in: {OUTPUT_DIR}/")
+    print("\n📂 Folder structure:")
+    print(f"   {OUTPUT_DIR}/")
+    for group in unique_groups:
+        print(f"   ├── {group}/ ({group_counts[group]} PDFs)")
+    print("\n🎉 All reports saved directly as PDF!")
 
 
 # ============================================================================
@@ -6,13 +6,51 @@ Works on Streamlit Cloud with PDF support via LibreOffice
 
 import streamlit as st
 import pandas as pd
-from docx import Document
+import numpy as np
 import os
 import subprocess
 import tempfile
 import zipfile
 from io import BytesIO
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from report_worker import prepare_template, init_worker, render_one
+import atexit
+import multiprocessing
 import shutil
+import threading
+import time
+
+# LibreOffice's own Python bridge, if this Python can see it (e.g. the
+# 'python3-uno' package). With it, one LibreOffice stays running for the
+# whole app; without it, each batch starts a fresh soffice process
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+    HAS_UNO = True
+except ImportError:
+    HAS_UNO = False
+
+# How many documents each LibreOffice call converts. One call per report would
+# pay LibreOffice's start-up cost every time; one call for everything can hit
+# the operating system's command-line length limit on big classes
+PDF_BATCH_SIZE = 50
+
+# How many students are handed to the workers at a time. Kept small: LibreOffice
+# is much slower than the workers, so every finished report waiting for its
+# turn sits in memory - this caps the wait at a few batches' worth
+CHUNK_SIZE = 4 * PDF_BATCH_SIZE
+
+# The only columns the reports use. 'category' stores each campus/group name
+# once; LIVE stays float64 because float32 would turn 0.7 into 69.99...%
+STUDENT_COLUMNS = ['Name', 'Surname', 'BNU ID', 'Campus', 'LIVE', 'Group Ref']
+STUDENT_DTYPES = {'LIVE': 'float64', 'Campus': 'category', 'Group Ref': 'category'}
+
+# Port the long-running LibreOffice listens on when HAS_UNO is True
+UNO_PORT = 2002
+
+# Seconds LibreOffice gets per report before we give up on it
+PDF_TIMEOUT = 30
 
 st.set_page_config(
     page_title="Attendance Report Generator",
@@ -20,8 +58,9 @@ st.set_page_config(
     layout="wide"
 )
 
+@st.cache_resource
 def check_libreoffice():
-    """Check if LibreOffice is installed"""
+    """Check if LibreOffice is installed (once - Streamlit reruns this file on every click)"""
     # Check common LibreOffice paths
     possible_paths = [
         '/usr/bin/soffice',  # Linux/Streamlit Cloud
@@ -39,118 +78,328 @@ def check_libreoffice():
     
     return None
 
-def generate_reports(df, template_file, output_format, group_by, libreoffice_path):
-    """Generate reports for all students"""
-    zip_buffer = BytesIO()
+@st.cache_data(show_spinner=False)
+def load_students(file_bytes, file_name):
+    """Read and clean the attendance sheet - cached, so reruns with the same file skip the parse"""
+    # Skip every other column while reading; headers can carry stray spaces
+    def wanted(column):
+        return str(column).strip() in STUDENT_COLUMNS
     
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        
-        total_students = len(df)
+    if file_name.lower().endswith('.csv'):
+        df = pd.read_csv(BytesIO(file_bytes), skiprows=1, usecols=wanted)
+    else:
+        # calamine: a Rust spreadsheet reader, many times faster than openpyxl
+        df = pd.read_excel(BytesIO(file_bytes), skiprows=1, engine='calamine', usecols=wanted)
+    
+    df.columns = df.columns.str.strip()
+    # 'Group Ref' is only needed when organizing by groups, so it may be missing
+    columns = [column for column in STUDENT_COLUMNS if column in df.columns or column != 'Group Ref']
+    dtypes = {column: dtype for column, dtype in STUDENT_DTYPES.items() if column in columns}
+    df = df[columns].dropna(subset=['BNU ID']).astype(dtypes)
+    # IDs are read as decimals (1001.0); turn them into text ('1001') once, here
+    df['BNU ID'] = df['BNU ID'].astype('int64').astype(str)
+    df['Name'] = df['Name'].str.strip()
+    df['Surname'] = df['Surname'].str.strip()
+    return df
+
+@st.cache_resource(show_spinner=False)
+def load_template(template_bytes):
+    """Prepare the uploaded template once per file - cached across runs and sessions"""
+    # Returns the skeleton zip (every part except document.xml, already
+    # compressed), document.xml's name and its placeholder-marked bytes
+    return prepare_template(template_bytes)
+
+def uno_property(name, value):
+    """Build one of the name/value settings LibreOffice's UNO functions expect"""
+    prop = PropertyValue()
+    prop.Name = name
+    prop.Value = value
+    return prop
+
+@st.cache_resource
+def start_libreoffice_listener(libreoffice_path):
+    """Start ONE LibreOffice that stays open for every run of the app, and connect to it"""
+    profile_dir = tempfile.mkdtemp(prefix='lo_profile_')
+    
+    office = subprocess.Popen(
+        [
+            libreoffice_path,
+            f'-env:UserInstallation={Path(profile_dir).as_uri()}',
+            '--headless',
+            '--invisible',
+            '--nologo',
+            '--norestore',
+            '--nofirststartwizard',
+            f'--accept=socket,host=127.0.0.1,port={UNO_PORT};urp;StarOffice.ComponentContext'
+        ],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    
+    def stop():
+        office.terminate()
+        try:
+            office.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            office.kill()
+        shutil.rmtree(profile_dir, ignore_errors=True)
+    
+    # Shut LibreOffice down when the app itself stops
+    atexit.register(stop)
+    
+    # It needs a few seconds before it accepts connections
+    local_context = uno.getComponentContext()
+    resolver = local_context.ServiceManager.createInstanceWithContext(
+        'com.sun.star.bridge.UnoUrlResolver', local_context
+    )
+    
+    deadline = time.monotonic() + 60
+    while True:
+        try:
+            context = resolver.resolve(
+                f'uno:socket,host=127.0.0.1,port={UNO_PORT};urp;StarOffice.ComponentContext'
+            )
+            break
+        except Exception:
+            if time.monotonic() > deadline or office.poll() is not None:
+                stop()
+                raise
+            time.sleep(0.5)
+    
+    desktop = context.ServiceManager.createInstanceWithContext(
+        'com.sun.star.frame.Desktop', context
+    )
+    
+    return office, desktop
+
+@st.cache_resource
+def libreoffice_lock():
+    """Streamlit runs each user's session in its own thread, so conversions take turns on the one LibreOffice"""
+    # Kept apart from the listener, so it stays the same lock when a new
+    # LibreOffice replaces a stuck one
+    return threading.Lock()
+
+def convert_with_listener(libreoffice_path, docx_paths):
+    """Convert the files through the long-running LibreOffice, next to the originals; returns {docx_path: error}"""
+    errors = {}
+    
+    with libreoffice_lock():
+        office, desktop = start_libreoffice_listener(libreoffice_path)
         
-        for index, row in df.iterrows():
-            
-            # Update progress
-            progress = int((index + 1) / total_students * 100)
-            
-            student_name = f"{row['Name']} {row['Surname']}"
-            bnu_id = str(int(row['BNU ID']))
-            campus = row['Campus']
-            attendance = row['LIVE']
-            
-            if group_by:
-                student_group = row['Group Ref']
+        for docx_path in docx_paths:
+            # Start a new one if the old LibreOffice has stopped, crashed or
+            # was stopped by the watchdog below
+            if office.poll() is not None:
+                start_libreoffice_listener.clear()
+                office, desktop = start_libreoffice_listener(libreoffice_path)
             
-            attendance_percent = attendance * 100
+            # The UNO calls have no timeout of their own, and a document that
+            # hangs LibreOffice would block every session behind the lock. So a
+            # watchdog kills LibreOffice after PDF_TIMEOUT seconds, which makes
+            # the stuck call fail; the next file starts a fresh LibreOffice
+            timed_out = threading.Event()
             
-            if attendance_percent >= 80:
-                attendance_category = "Excellent attendance"
-            elif attendance_percent >= 70:
-                attendance_category = "Very good attendance"
-            elif attendance_percent >= 60:
-                attendance_category = "Good attendance"
-            else:
-                attendance_category = "Attendance could be better"
+            def give_up(office=office):
+                timed_out.set()
+                office.kill()
             
-            # Create document from template
-            doc = Document(template_file)
+            watchdog = threading.Timer(PDF_TIMEOUT, give_up)
+            watchdog.start()
             
-            table = doc.tables[0]
-            table.rows[4].cells[1].text = student_name
-            table.rows[5].cells[1].text = bnu_id
-            table.rows[6].cells[1].text = campus
-            
-            attendance_table = doc.tables[1]
-            attendance_table.rows[1].cells[1].text = ""
-            attendance_table.rows[2].cells[1].text = ""
-            attendance_table.rows[3].cells[1].text = ""
-            attendance_table.rows[4].cells[1].text = ""
+            # One broken file shouldn't stop the others - note it and carry on
+            try:
+                document = desktop.loadComponentFromURL(
+                    Path(docx_path).as_uri(), '_blank', 0,
+                    (uno_property('Hidden', True),)
+                )
+                if document is None:
+                    raise RuntimeError("LibreOffice could not open the document")
+                
+                try:
+                    document.storeToURL(
+                        Path(docx_path).with_suffix('.pdf').as_uri(),
+                        (uno_property('FilterName', 'writer_pdf_Export'),)
+                    )
+                finally:
+                    document.close(True)
             
-            if attendance_category == "Excellent attendance":
-                attendance_table.rows[1].cells[1].text = "Yes"
-            elif attendance_category == "Very good attendance":
-                attendance_table.rows[2].cells[1].text = "Yes"
-            elif attendance_category == "Good attendance":
-                attendance_table.rows[3].cells[1].text = "Yes"
-            else:
-                attendance_table.rows[4].cells[1].text = "Yes"
+            except Exception as e:
+                errors[docx_path] = str(e)
             
-            # Determine file path in zip
-            if group_by:
-                base_path = f"{student_group}/{bnu_id}_{row['Surname']}_{row['Name']}_Attendance_Report"
-            else:
-                base_path = f"{bnu_id}_{row['Surname']}_{row['Name']}_Attendance_Report"
+            finally:
+                watchdog.cancel()
             
-            # Save as DOCX or convert to PDF
-            if output_format == "DOCX":
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as temp:
-                    doc.save(temp.name)
-                    zip_file.write(temp.name, f"{base_path}.docx")
-                    os.unlink(temp.name)
+            if timed_out.is_set():
+                errors[docx_path] = f"LibreOffice took longer than {PDF_TIMEOUT} seconds"
+    
+    return errors
+
+def convert_pdf_batch(batch, temp_dir, zip_file, libreoffice_path):
+    """Convert one batch of saved .docx files to PDF and add them to the zip; returns the failures"""
+    docx_paths = [os.path.join(temp_dir, f"{index}.docx") for index, _ in batch]
+    errors = {}
+    
+    if HAS_UNO:
+        errors = convert_with_listener(libreoffice_path, docx_paths)
+    
+    else:
+        # Convert the whole batch with ONE LibreOffice call, so
+        # LibreOffice only starts up once per batch, not per student
+        command = [
+            libreoffice_path,
+            '--headless',
+            '--convert-to',
+            'pdf',
+            '--outdir',
+            temp_dir,
+            *docx_paths
+        ]
+        
+        # LibreOffice's messages are thrown away - nobody reads them when it works
+        try:
+            subprocess.run(
+                command,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                check=True,
+                timeout=PDF_TIMEOUT * len(batch)
+            )
+        except subprocess.CalledProcessError:
+            # Try once more, keeping the messages this time so we can show them
+            result = subprocess.run(
+                command,
+                capture_output=True,
+                text=True,
+                timeout=PDF_TIMEOUT * len(batch)
+            )
+            if result.returncode != 0:
+                raise RuntimeError(f"LibreOffice could not convert the reports to PDF:\n{result.stderr}")
+    
+    # Add the PDFs to the zip under their report names, then free the disk space
+    failed = []
+    
+    for (index, base_path), docx_path in zip(batch, docx_paths):
+        pdf_path = os.path.join(temp_dir, f"{index}.pdf")
+        if os.path.exists(pdf_path):
+            zip_file.write(pdf_path, f"{base_path}.pdf")
+            os.unlink(pdf_path)
+        else:
+            failed.append(f"{base_path}.pdf: {errors.get(docx_path, 'no PDF was produced')}")
+        os.unlink(docx_path)
+    
+    return failed
+
+def prepare_students(df, group_by):
+    """Turn a slice of the sheet into the workers' (name, ID, campus, row) tuples and the zip paths"""
+    # Walk the columns as plain arrays instead of df.iterrows()
+    bnu_ids = df['BNU ID']
+    # fillna('nan'): newer pandas leaves blanks as gaps after astype(str), and
+    # one gap would blank out the whole zip path
+    names = df['Name'].astype(str).fillna('nan')
+    surnames = df['Surname'].astype(str).fillna('nan')
+    
+    # Row of the attendance table to tick, worked out for everyone at once:
+    # 1 = Excellent (80%+), 2 = Very good (70%+), 3 = Good (60%+), 4 = could be better
+    attendance_percents = df['LIVE'].to_numpy() * 100
+    attendance_rows = np.select(
+        [attendance_percents >= 80, attendance_percents >= 70, attendance_percents >= 60],
+        [1, 2, 3],
+        default=4
+    )
+    
+    # What each worker needs, as one tuple per student
+    full_names = (names + ' ' + surnames).to_numpy()
+    students = list(zip(full_names, bnu_ids.to_numpy(), df['Campus'].astype(str).to_numpy(), attendance_rows))
+    
+    # Every student's file path in the zip, built as whole columns too
+    base_paths = bnu_ids + '_' + surnames + '_' + names + '_Attendance_Report'
+    if group_by:
+        base_paths = df['Group Ref'].astype(str).fillna('nan') + '/' + base_paths
+    
+    return students, base_paths.to_numpy()
+
+def generate_reports(df, template_file, output_format, group_by, libreoffice_path, on_progress=None):
+    """Generate reports for all students; returns (zip file, reports that failed).
+    on_progress(percent) is called as reports are finished"""
+    # Build the zip in memory while it is small, but let it move to a temporary
+    # file on disk once it grows past 128 MB so large classes can't run out of RAM
+    zip_buffer = tempfile.SpooledTemporaryFile(max_size=128 << 20)
+    
+    # Mark the template's cells with placeholders ONCE; the workers then
+    # fill each student's report by plain text replacement
+    skeleton_bytes, document_xml_name, document_xml = load_template(template_file.getvalue())
+    
+    pdf_jobs = []
+    failed = []
+    
+    # Tell the caller about progress at most ~50 times in total - every
+    # update is a round trip to the browser, so one per student would slow us down
+    total_students = len(df)
+    progress_step = max(1, total_students // 50)
+    finished = 0
+    
+    def reports_finished(count):
+        nonlocal finished
+        if on_progress and (finished + count) // progress_step != finished // progress_step:
+            on_progress(int((finished + count) / total_students * 100))
+        finished += count
+    
+    # One working folder for the whole run: PDF mode saves each .docx here and
+    # converts them PDF_BATCH_SIZE at a time, as soon as a batch is ready.
+    # The folder and everything in it is deleted when the 'with' block ends
+    with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as temp_dir:
+        # ZIP_STORED: PDFs and DOCX files are already compressed inside, so
+        # compressing them again costs time and saves almost no space
+        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_STORED) as zip_file:
             
-            else:  # PDF
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.docx') as temp_docx:
-                    doc.save(temp_docx.name)
-                    
-                    # Create temporary output directory
-                    temp_dir = tempfile.mkdtemp()
-                    
-                    try:
-                        # Convert to PDF using LibreOffice
-                        command = [
-                            libreoffice_path,
-                            '--headless',
-                            '--convert-to',
-                            'pdf',
-                            '--outdir',
-                            temp_dir,
-                            temp_docx.name
-                        ]
-                        
-                        subprocess.run(
-                            command,
-                            capture_output=True,
-                            text=True,
-                            check=True,
-                            timeout=30
-                        )
-                        
-                        # Get PDF filename
-                        pdf_name = os.path.splitext(os.path.basename(temp_docx.name))[0] + '.pdf'
-                        pdf_path = os.path.join(temp_dir, pdf_name)
-                        
-                        # Add PDF to zip
-                        if os.path.exists(pdf_path):
-                            zip_file.write(pdf_path, f"{base_path}.pdf")
-                            os.unlink(pdf_path)
+            # Fill the documents in worker processes, one per CPU core. Only
+            # this process writes to the zip - ZipFile isn't safe to share.
+            # 'spawn' starts each worker as a fresh Python: on Linux the default
+            # would fork this whole multi-threaded Streamlit server, which can
+            # deadlock. The workers only need report_worker, not this file
+            with ProcessPoolExecutor(
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=init_worker,
+                initargs=(skeleton_bytes, document_xml_name, document_xml)
+            ) as executor:
+                
+                try:
+                    # CHUNK_SIZE students at a time, so neither the per-student
+                    # lists nor the finished reports ever hold the whole class
+                    for start in range(0, len(df), CHUNK_SIZE):
+                        students, base_paths = prepare_students(df.iloc[start:start + CHUNK_SIZE], group_by)
                         
-                    finally:
-                        # Cleanup
-                        os.unlink(temp_docx.name)
-                        if os.path.exists(temp_dir):
-                            shutil.rmtree(temp_dir)
+                        for index, (base_path, docx_bytes) in enumerate(zip(
+                            base_paths, executor.map(render_one, students, chunksize=16)
+                        ), start):
+                            
+                            # Save as DOCX or queue for PDF conversion
+                            if output_format == "DOCX":
+                                zip_file.writestr(f"{base_path}.docx", docx_bytes)
+                                reports_finished(1)
+                            
+                            else:  # PDF
+                                with open(os.path.join(temp_dir, f"{index}.docx"), 'wb') as docx_file:
+                                    docx_file.write(docx_bytes)
+                                pdf_jobs.append((index, base_path))
+                                
+                                # The workers keep filling the rest of the chunk while LibreOffice converts
+                                if len(pdf_jobs) == PDF_BATCH_SIZE:
+                                    failed += convert_pdf_batch(pdf_jobs, temp_dir, zip_file, libreoffice_path)
+                                    reports_finished(len(pdf_jobs))
+                                    pdf_jobs = []
+                
+                except BaseException:
+                    # Don't wait for the reports still queued - they'd be thrown away
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    raise
+            
+            if pdf_jobs:
+                failed += convert_pdf_batch(pdf_jobs, temp_dir, zip_file, libreoffice_path)
+                reports_finished(len(pdf_jobs))
     
     zip_buffer.seek(0)
-    return zip_buffer
+    return zip_buffer, failed
 
 # Check LibreOffice availability
 libreoffice_path = check_libreoffice()
@@ -174,8 +423,8 @@ col1, col2 = st.columns(2)
 with col1:
     excel_file = st.file_uploader(
         "Upload Student Attendance Excel",
-        type=['xlsx', 'xls'],
-        help="Upload your Excel file with student attendance data"
+        type=['xlsx', 'xls', 'csv'],
+        help="Upload your Excel file (or a CSV export of it) with student attendance data"
     )
 
 with col2:
@@ -222,11 +471,7 @@ if st.button("Generate Reports", type="primary", use_container_width=True):
         else:
             try:
                 with st.spinner("Reading attendance data..."):
-                    df = pd.read_excel(excel_file, skiprows=1)
-                    df.columns = df.columns.str.strip()
-                    df = df.dropna(subset=['BNU ID'])
-                    df['Name'] = df['Name'].str.strip()
-                    df['Surname'] = df['Surname'].str.strip()
+                    df = load_students(excel_file.getvalue(), excel_file.name)
                 
                 st.info(f"✅ Loaded {len(df)} students")
                 
@@ -236,19 +481,28 @@ if st.button("Generate Reports", type="primary", use_container_width=True):
                 
                 with st.spinner(f"Generating {len(df)} {output_format} reports... This may take a few minutes."):
                     progress_bar = st.progress(0)
-                    zip_buffer = generate_reports(df, template_file, output_format, group_by, libreoffice_path)
+                    zip_buffer, failed = generate_reports(
+                        df, template_file, output_format, group_by, libreoffice_path,
+                        on_progress=progress_bar.progress
+                    )
                     progress_bar.progress(100)
                 
-                st.success(f"🎉 Successfully generated {len(df)} reports!")
+                st.success(f"🎉 Successfully generated {len(df) - len(failed)} reports!")
+                
+                if failed:
+                    st.warning(f"⚠️ {len(failed)} reports could not be converted to PDF:\n\n" + "\n".join(f"- {line}" for line in failed))
                 
+                # st.download_button needs the whole file as bytes - it can't
+                # stream - so the zip is only read into memory here, once
                 st.download_button(
                     label=f"⬇️ Download All Reports ({output_format})",
-                    data=zip_buffer,
+                    data=zip_buffer.read(),
                     file_name=f"attendance_reports_{output_format.lower()}.zip",
                     mime="application/zip",
                     type="primary",
                     use_container_width=True
                 )
+                zip_buffer.close()
                 
             except Exception as e:
                 st.error(f"❌ Error: {str(e)}")
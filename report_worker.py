@@ -0,0 +1,102 @@
+"""
+REPORT WORKER
+=============
+Fills the template for one student. Shared by attendance_app.py and scripts 1 and 3,
+whose worker processes all import it.
+
+Streamlit runs attendance_app.py as a script, so worker processes can't import
+functions from it - they live in this small module instead.
+"""
+
+import re
+import zipfile
+from io import BytesIO
+from xml.sax.saxutils import escape
+from docx import Document
+
+# The markers render_one() fills in for every student
+STUDENT_PLACEHOLDERS = re.compile(rb'(\{\{STUDENT_NAME\}\}|\{\{BNU_ID\}\}|\{\{CAMPUS\}\})')
+
+def prepare_template(template_bytes):
+    """Put placeholders into the template's cells; return (skeleton zip, document.xml name, document.xml)"""
+    # python-docx is only used here, once. Each student's document.xml is
+    # then made by text replacement, and added to a copy of the skeleton:
+    # the template's other parts (styles, fonts...), already compressed
+    doc = Document(BytesIO(template_bytes))
+
+    table = doc.tables[0]
+    table.rows[4].cells[1].text = '{{STUDENT_NAME}}'
+    table.rows[5].cells[1].text = '{{BNU_ID}}'
+    table.rows[6].cells[1].text = '{{CAMPUS}}'
+
+    attendance_table = doc.tables[1]
+    for row in (1, 2, 3, 4):
+        attendance_table.rows[row].cells[1].text = f'{{{{ATTENDANCE_ROW_{row}}}}}'
+
+    document_xml_name = doc.part.partname.lstrip('/')
+
+    skeleton = BytesIO()
+    with zipfile.ZipFile(BytesIO(template_bytes)) as template_zip, \
+            zipfile.ZipFile(skeleton, 'w') as skeleton_zip:
+        for item in template_zip.infolist():
+            if item.filename != document_xml_name:
+                skeleton_zip.writestr(item, template_zip.read(item.filename))
+
+    return skeleton.getvalue(), document_xml_name, doc.part.blob
+
+def make_filler(document_xml):
+    """Cut document.xml at the student placeholders once, and return a fill(values) for it"""
+    # Splitting with a (group) keeps the placeholders: even pieces are the
+    # fixed XML between them, odd pieces say which value goes in each gap
+    pieces = STUDENT_PLACEHOLDERS.split(document_xml)
+    fixed_parts = pieces[0::2]
+    placeholders = pieces[1::2]
+
+    def fill(values):
+        parts = [fixed_parts[0]]
+        for placeholder, fixed_part in zip(placeholders, fixed_parts[1:]):
+            parts.append(values[placeholder])
+            parts.append(fixed_part)
+        return b''.join(parts)
+
+    return fill
+
+def init_worker(skeleton_bytes, document_xml_name, document_xml):
+    """Keep the prepared template in this worker process, with each checkbox row ticked once"""
+    global SKELETON_BYTES, DOCUMENT_XML_NAME, FILL_FOR_ROW
+
+    SKELETON_BYTES = skeleton_bytes
+    DOCUMENT_XML_NAME = document_xml_name
+
+    FILL_FOR_ROW = {}
+    for attendance_row in (1, 2, 3, 4):
+        ticked_xml = document_xml
+        for row in (1, 2, 3, 4):
+            ticked_xml = ticked_xml.replace(
+                f'{{{{ATTENDANCE_ROW_{row}}}}}'.encode('utf-8'),
+                b'Yes' if row == attendance_row else b''
+            )
+        FILL_FOR_ROW[attendance_row] = make_filler(ticked_xml)
+
+def build_docx(student_name, bnu_id, campus, attendance_row, compress_type=zipfile.ZIP_DEFLATED):
+    """Fill the template prepared by init_worker() and return the .docx file's bytes"""
+    # One join of the ready-cut pieces, instead of searching the whole XML
+    # once per placeholder
+    document_xml = FILL_FOR_ROW[attendance_row]({
+        b'{{STUDENT_NAME}}': escape(str(student_name)).encode('utf-8'),
+        b'{{BNU_ID}}': escape(str(bnu_id)).encode('utf-8'),
+        b'{{CAMPUS}}': escape(str(campus)).encode('utf-8'),
+    })
+
+    # Start from a copy of the skeleton and append ('a') this student's document.xml
+    docx_buffer = BytesIO(SKELETON_BYTES)
+    with zipfile.ZipFile(docx_buffer, 'a') as report_zip:
+        # The fastest deflate level: the app's zip stores the .docx as-is, so
+        # this is the only compression, but XML barely gains from higher levels
+        report_zip.writestr(DOCUMENT_XML_NAME, document_xml, compress_type=compress_type, compresslevel=1)
+
+    return docx_buffer.getvalue()
+
+def render_one(student):
+    """The app's worker: one (name, ID, campus, row) tuple in, the .docx bytes out"""
+    return build_docx(*student)
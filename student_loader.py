@@ -0,0 +1,130 @@
+"""
+STUDENT LOADER
+==============
+Reads the attendance sheet a chunk at a time. Shared by scripts 1 and 3.
+
+The first read of an Excel file also saves a Parquet copy next to it, which
+later runs read instead, until the Excel file changes.
+"""
+
+import os
+import shutil
+import tempfile
+import openpyxl
+import pandas as pd
+
+def column_picker(columns):
+    """Return a check for 'is this header one of columns?' - headers may carry stray spaces"""
+    def wanted_column(column):
+        return str(column).strip() in columns
+    return wanted_column
+
+def tidy_students(students, columns, dtypes):
+    """Strip the column names, keep only 'columns' and store them as 'dtypes'"""
+    students.columns = students.columns.str.strip()
+
+    # Excel often stores IDs as text ('1001'); turn those into numbers first
+    students['BNU ID'] = pd.to_numeric(students['BNU ID'])
+
+    return students[columns].astype(dtypes)
+
+def read_excel_chunks(path, columns, chunk_size):
+    """Stream the first sheet with openpyxl's read-only mode, chunk_size rows per DataFrame"""
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+
+    try:
+        # worksheets[0], like pd.read_excel: 'active' is whichever tab was
+        # open when the file was last saved. Row 1 is the sheet's title,
+        # row 2 holds the column headers
+        rows = workbook.worksheets[0].iter_rows(min_row=2, values_only=True)
+        header = next(rows)
+
+        wanted_column = column_picker(columns)
+        keep = [i for i, column in enumerate(header) if wanted_column(column)]
+        names = [header[i] for i in keep]
+
+        buffer = []
+        for row in rows:
+            buffer.append([row[i] if i < len(row) else None for i in keep])
+
+            if len(buffer) == chunk_size:
+                yield pd.DataFrame(buffer, columns=names)
+                buffer = []
+
+        if buffer:
+            yield pd.DataFrame(buffer, columns=names)
+
+    finally:
+        workbook.close()
+
+def cached_parts(cache_dir, path, columns):
+    """The Parquet copy's chunk files, or None if there is no usable, up-to-date copy"""
+    if not os.path.isdir(cache_dir) or os.path.getmtime(cache_dir) < os.path.getmtime(path):
+        return None
+
+    # Only our own files: Finder, for one, drops a '.DS_Store' into any folder it opens
+    parts = [
+        os.path.join(cache_dir, name) for name in sorted(os.listdir(cache_dir))
+        if name.startswith('part_') and name.endswith('.parquet')
+    ]
+
+    # Script 1 and script 3 use different columns - a copy saved by the
+    # other one may be missing some of ours
+    if parts:
+        try:
+            pd.read_parquet(parts[0], columns=columns)
+        except Exception:
+            return None
+
+    return parts
+
+def load_student_chunks(path, columns, dtypes, chunk_size):
+    """Yield the attendance sheet as DataFrames of up to chunk_size students"""
+    # WHY A PARQUET COPY?
+    # - Reading .xlsx is slow: Excel files are zipped XML that must be parsed
+    # - Parquet is a compact column-based format pandas reads many times faster
+    if path.lower().endswith('.csv'):
+        for chunk in pd.read_csv(path, skiprows=1, usecols=column_picker(columns), chunksize=chunk_size):
+            yield tidy_students(chunk, columns, dtypes)
+        return
+
+    # The Parquet copy is a folder holding one file per chunk
+    cache_dir = os.path.splitext(path)[0] + '.parquet'
+
+    parts = cached_parts(cache_dir, path, columns)
+    if parts is not None:
+        for part in parts:
+            yield pd.read_parquet(part, columns=columns)
+        return
+
+    # Save the chunks into a temporary folder first, and only swap it in once
+    # every chunk is written - a half-finished copy must never look up to date
+    new_cache_dir = tempfile.mkdtemp(prefix='.parquet_', dir=os.path.dirname(cache_dir))
+    cache_ok = True
+
+    try:
+        for number, chunk in enumerate(read_excel_chunks(path, columns, chunk_size)):
+            chunk = tidy_students(chunk, columns, dtypes)
+
+            if cache_ok:
+                try:
+                    chunk.to_parquet(os.path.join(new_cache_dir, f'part_{number:05d}.parquet'))
+                except Exception as e:
+                    # Parquet needs the 'pyarrow' library - without it we simply skip the cache
+                    print(f"   ⚠️ Could not save a Parquet copy for next time: {e}")
+                    cache_ok = False
+
+            yield chunk
+
+    except BaseException:
+        # An error (or Ctrl-C) while the reports were being made - don't leave
+        # the half-written folder behind next to the Excel file
+        shutil.rmtree(new_cache_dir, ignore_errors=True)
+        raise
+
+    if cache_ok:
+        if os.path.isdir(cache_dir):
+            shutil.rmtree(cache_dir)
+        os.rename(new_cache_dir, cache_dir)
+    else:
+        shutil.rmtree(new_cache_dir, ignore_errors=True)